@@ -2,7 +2,7 @@
 
 from    jobController       import jobber
 from    pathlib             import Path
-from    argparse            import ArgumentParser, Namespace, ArgumentDefaultsHelpFormatter
+from    argparse            import ArgumentParser, Namespace, ArgumentDefaultsHelpFormatter, ArgumentTypeError
 
 from    chris_plugin        import chris_plugin, PathMapper
 from    typing              import Callable, Any, Iterable, Iterator
@@ -11,7 +11,9 @@ from    pflog               import pflog
 from    concurrent.futures  import ThreadPoolExecutor, ProcessPoolExecutor
 from    functools           import partial
 from    pytz                import timezone
-import  os, sys
+import  os, sys, json, time, itertools, collections
+import  cProfile, pstats, multiprocessing, multiprocessing.util
+import  hashlib, shutil
 import  pudb
 import  pydicom
 import  datetime
@@ -52,6 +54,16 @@ DISPLAY_TITLE = r"""
 """
 
 
+def path_absolute(value: str) -> str:
+    """
+    argparse type for paths that, not living under the plugin's
+    inputdir or outputdir, must be absolute (the working directory
+    of a ChRIS plugin is arbitrary).
+    """
+    if value and not os.path.isabs(value):
+        raise ArgumentTypeError(f"'{value}' is not an absolute path")
+    return value
+
 parser = ArgumentParser(description='''
     A ChRIS DS plugin that "makes" a new DICOM file from an image and
     an exemplar DICOM.
@@ -92,6 +104,36 @@ parser.add_argument("--appendToSeriesDescription",
                     default     = '',
                     type        = str,
                     help        = 'optional text to append to series description')
+parser.add_argument("--batchSize",
+                    dest        = 'batchSize',
+                    default     = 0,
+                    type        = int,
+                    help        = 'if > 0, decode same-shape images in stacked batches of (at most) this size')
+parser.add_argument("--maxErrorRate",
+                    dest        = 'maxErrorRate',
+                    default     = 1.0,
+                    type        = float,
+                    help        = 'abort the run once more than this fraction of all pairs has failed')
+parser.add_argument("--report",
+                    dest        = 'report',
+                    default     = '',
+                    type        = str,
+                    help        = 'if specified, save a JSON report of per-file results here (relative to outputdir)')
+parser.add_argument("--profile",
+                    dest        = 'profile',
+                    default     = '',
+                    type        = str,
+                    help        = 'if specified, profile the run into this directory (relative to outputdir)')
+parser.add_argument("--cacheDir",
+                    dest        = 'cacheDir',
+                    default     = '',
+                    type        = path_absolute,
+                    help        = 'if specified, reuse/store outputs in this content-addressed cache directory (absolute path)')
+parser.add_argument("--cacheMaxSize",
+                    dest        = 'cacheMaxSize',
+                    default     = 1024,
+                    type        = int,
+                    help        = 'maximum cache size in MiB, least recently used entries are evicted')
 parser.add_argument('--version',
                     action      = 'version',
                     version     = f'%(prog)s {__version__}')
@@ -115,35 +157,48 @@ from pydicom.uid import ExplicitVRLittleEndian
 from PIL import Image
 import pydicom
 
-# Optimized for lower memory consumption
-# Compared to the existing mode, ~84% reduction in memory usage was observed
-def image_intoDICOMinsert(image: Image.Image, ds: pydicom.Dataset, str_append: str) -> pydicom.Dataset:
+def frameTags_determine(frame: np.ndarray) -> dict[str, Any]:
     """
-    Insert the "image" into the DICOM chassis "ds" and update/adapt
-    DICOM tags where necessary. Also creates new SeriesInstanceUID and SOPInstanceUID.
-    Optimized for minimal memory usage.
+    Determine the image-related DICOM tags for a single frame. Since
+    these depend only on the frame's shape, a caller processing a stack
+    of same-shape frames need only do this once.
+
+    Args:
+        frame (np.ndarray): a single uint8 image frame
+
+    Returns:
+        dict[str, Any]: tag name -> value
     """
     now = datetime.datetime.now()
-    ds.AcquisitionDate = now.strftime('%Y%m%d')
-    ds.AcquisitionTime = now.strftime('%H%M%S')
-
-    # Efficient conversion using np.asarray
-    arr = np.asarray(image, dtype=np.uint8)
-    if arr.ndim == 3 and arr.shape[2] == 3:
-        ds.PhotometricInterpretation = 'RGB'
-        ds.SamplesPerPixel = 3
-        ds.PlanarConfiguration = 0  # Required for RGB
+    d_tags:dict[str, Any] = {
+        'AcquisitionDate'   : now.strftime('%Y%m%d'),
+        'AcquisitionTime'   : now.strftime('%H%M%S'),
+    }
+    if frame.ndim == 3 and frame.shape[2] == 3:
+        d_tags['PhotometricInterpretation'] = 'RGB'
+        d_tags['SamplesPerPixel']           = 3
+        d_tags['PlanarConfiguration']       = 0  # Required for RGB
     else:
-        ds.PhotometricInterpretation = 'MONOCHROME1'
-        ds.SamplesPerPixel = 1
-
-    ds.Rows = image.height
-    ds.Columns = image.width
-    ds.BitsAllocated = 8
-    ds.BitsStored = 8
-    ds.HighBit = 7
-    ds.PixelRepresentation = 0
-    ds.PixelData = arr.tobytes()
+        d_tags['PhotometricInterpretation'] = 'MONOCHROME1'
+        d_tags['SamplesPerPixel']           = 1
+    d_tags['Rows']                  = frame.shape[0]
+    d_tags['Columns']               = frame.shape[1]
+    d_tags['BitsAllocated']         = 8
+    d_tags['BitsStored']            = 8
+    d_tags['HighBit']               = 7
+    d_tags['PixelRepresentation']   = 0
+    return d_tags
+
+def frame_intoDICOMinsert(frame: np.ndarray, ds: pydicom.Dataset,
+                          d_tags: dict[str, Any], str_append: str) -> pydicom.Dataset:
+    """
+    Insert the (already decoded) "frame" into the DICOM chassis "ds",
+    applying the precomputed "d_tags" from frameTags_determine(). Also
+    creates new SeriesInstanceUID and SOPInstanceUID.
+    """
+    for tag, value in d_tags.items():
+        setattr(ds, tag, value)
+    ds.PixelData = frame.tobytes()
 
     # Ensure proper transfer syntax
     ds.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
@@ -159,6 +214,18 @@ def image_intoDICOMinsert(image: Image.Image, ds: pydicom.Dataset, str_append: s
 
     return ds
 
+# Optimized for lower memory consumption
+# Compared to the existing mode, ~84% reduction in memory usage was observed
+def image_intoDICOMinsert(image: Image.Image, ds: pydicom.Dataset, str_append: str) -> pydicom.Dataset:
+    """
+    Insert the "image" into the DICOM chassis "ds" and update/adapt
+    DICOM tags where necessary. Also creates new SeriesInstanceUID and SOPInstanceUID.
+    Optimized for minimal memory usage.
+    """
+    # Efficient conversion using np.asarray
+    arr = np.asarray(image, dtype=np.uint8)
+    return frame_intoDICOMinsert(arr, ds, frameTags_determine(arr), str_append)
+
 def doubly_map(x: PathMapper, y: PathMapper) -> Iterable[tuple[Path, Path, Path, Path]]:
     """
     Combine two Mappers and yield the combined results.
@@ -308,21 +375,64 @@ def allIO_findExplicitly(options: Namespace, inputdir: Path, outputdir: Path) \
     d_ret['outputIMG']     = [Path(y) for y in sorted([str(x) for x in l_outputIMG])]
     return d_ret
 
-def files_unspool(d_paths:dict[str, Any], compress: bool, appendTxt: str) -> Iterator[tuple[Path, Path, Path, bool, str]]:
+def files_unspool(d_paths:dict[str, Any], compress: bool, appendTxt: str, cacheDir: str = '')\
+    -> Iterator[tuple[Path, Path, Path, bool, str, str]]:
     """
     This implements an Iterator over the lists passed in d_paths, and is ultimately
     used as a mapper in the main method.
 
     Args:
         d_paths (dict[str, Any]): a dictionary of lists of files to process
+        compress (bool): compress the output DICOMs
+        appendTxt (str): text to append to the series description
+        cacheDir (str, optional): output cache directory. Defaults to ''.
 
     Yields:
-        Iterator[tuple[Path, Path, Path]]: DICOM input, image input, and DICOM output
+        Iterator[tuple[Path, Path, Path, bool, str, str]]: DICOM input, image input,
+            and DICOM output, with settings
     """
     for dcm_in, img_in, dcm_out in zip( d_paths['d_IO']['inputDCM'],
                                         d_paths['d_IO']['inputIMG'],
                                         d_paths['d_IO']['outputDCM']):
-        yield dcm_in, img_in, dcm_out, compress, appendTxt
+        yield dcm_in, img_in, dcm_out, compress, appendTxt, cacheDir
+
+def files_batchUnspool(d_paths:dict[str, Any], batchSize: int, compress: bool, appendTxt: str,
+                       cacheDir: str = '')\
+    -> Iterator[tuple[list[tuple[Path, Path, Path]], bool, str, str]]:
+    """
+    Group the lists passed in d_paths into batches of images that share
+    the same size and mode, so that each batch can be decoded into a
+    single stacked array by imageBatch_process(). Only the image headers
+    are read here. Pairs whose file stems differ, or whose image header
+    cannot be read, are grouped together and left to imageBatch_process()
+    to record as skipped or failed.
+
+    Args:
+        d_paths (dict[str, Any]): a dictionary of lists of files to process
+        batchSize (int): maximum number of files per batch
+        compress (bool): compress the output DICOMs
+        appendTxt (str): text to append to the series description
+        cacheDir (str, optional): output cache directory. Defaults to ''.
+
+    Yields:
+        Iterator[tuple[list[tuple[Path, Path, Path]], bool, str, str]]: a batch of
+            (DICOM input, image input, DICOM output) triplets, with settings
+    """
+    d_groups:dict[tuple[tuple[int, int], str] | None, list[tuple[Path, Path, Path]]] = {}
+    for dcm_in, img_in, dcm_out in zip( d_paths['d_IO']['inputDCM'],
+                                        d_paths['d_IO']['inputIMG'],
+                                        d_paths['d_IO']['outputDCM']):
+        key:tuple[tuple[int, int], str] | None = None
+        if imageNames_areSame(img_in, dcm_in):
+            try:
+                with Image.open(str(img_in)) as image:
+                    key = (image.size, image.mode)
+            except Exception as ex:
+                LOG("Could not read header of %s: %s" % (img_in.name, ex))
+        d_groups.setdefault(key, []).append((dcm_in, img_in, dcm_out))
+    for l_group in d_groups.values():
+        for i in range(0, len(l_group), batchSize):
+            yield l_group[i:i + batchSize], compress, appendTxt, cacheDir
 
 def imageNames_areSame(imgfile:Path, dcmfile:Path) -> bool:
     """
@@ -344,8 +454,16 @@ def compress_DICOM(image: Image.Image, ds: pydicom.Dataset, op_path: str, str_ap
     `dcmcjpeg` , which is a library available in the `dcmtk`
     package.
     """
-    tmp_path = '/tmp/uncompressed.dcm'
-    image_intoDICOMinsert(image, ds, str_append).save_as(tmp_path)
+    DICOM_compressSave(image_intoDICOMinsert(image, ds, str_append), op_path)
+
+def DICOM_compressSave(ds: pydicom.Dataset, op_path: str):
+    """
+    Save an already populated DICOM "ds" to "op_path", compressed
+    with `dcmcjpeg`.
+    """
+    # per-process scratch file, so that pool workers do not clobber each other
+    tmp_path = '/tmp/uncompressed-%d.dcm' % os.getpid()
+    ds.save_as(tmp_path)
     LOG(f"Compressing final DICOM as {op_path}")
     shell = jobber({'verbosity': 1, 'noJobLogging': True})
     str_cmd = (f"dcmcjpeg"
@@ -360,13 +478,167 @@ def compress_DICOM(image: Image.Image, ds: pydicom.Dataset, op_path: str, str_ap
     else:
         LOG("Response: File compressed successfully.")
 
-def imagePaths_process(*args) -> None:
+def result_init(dcm_in: Path, img_in: Path, dcm_out: Path) -> dict[str, Any]:
+    """
+    Create the (picklable) result record for a single DICOM/image pair.
+    Processing functions fill in the status, output size and per-stage
+    timing (in seconds) and return the record to the caller.
+
+    Args:
+        dcm_in (Path): the DICOM input
+        img_in (Path): the image input
+        dcm_out (Path): the DICOM output
+
+    Returns:
+        dict[str, Any]: the result record
+    """
+    return {
+        'inputDCM'  : str(dcm_in),
+        'inputIMG'  : str(img_in),
+        'outputDCM' : str(dcm_out),
+        'status'    : 'ok',
+        'bytes'     : 0,
+        'error'     : '',
+        'cache'     : '',
+        'timing'    : {'read': 0.0, 'insert': 0.0, 'save': 0.0}
+    }
+
+def result_fail(d_result: dict[str, Any], ex: Exception) -> dict[str, Any]:
+    """
+    Mark a result record as failed with the passed exception.
+    """
+    d_result['status']  = 'failed'
+    d_result['error']   = f"{type(ex).__name__}: {ex}"
+    LOG("Failed %s: %s" % (d_result['inputDCM'], d_result['error']))
+    return d_result
+
+def frame_intoDICOMsave(frame: np.ndarray, d_tags: dict[str, Any], d_result: dict[str, Any],
+                        b_compress: bool, str_append: str) -> dict[str, Any]:
+    """
+    Read the exemplar DICOM of the d_result record, insert the decoded
+    "frame" and save (optionally compressed) to the record's output,
+    timing each stage. Exceptions are left to the caller.
+    """
+    tic:float               = time.perf_counter()
+    DICOM:pydicom.Dataset   = pydicom.dcmread(d_result['inputDCM'])
+    LOG("Processing %s using %s" % (Path(d_result['inputDCM']).name,
+                                    Path(d_result['inputIMG']).name))
+    toc:float               = time.perf_counter()
+    d_result['timing']['read']  += toc - tic
+    DICOM                   = frame_intoDICOMinsert(frame, DICOM, d_tags, str_append)
+    tic                     = time.perf_counter()
+    d_result['timing']['insert'] = tic - toc
+    if b_compress:
+        DICOM_compressSave(DICOM, d_result['outputDCM'])
+    else:
+        DICOM.save_as(d_result['outputDCM'])
+    d_result['timing']['save']  = time.perf_counter() - tic
+    d_result['bytes']       = Path(d_result['outputDCM']).stat().st_size
+    LOG("Saved %s" % d_result['outputDCM'])
+    return d_result
+
+def cache_key(dcm_in: Path, img_in: Path, b_compress: bool, str_append: str) -> str:
+    """
+    The content address of an output DICOM: a hash of the image bytes,
+    the template DICOM bytes and the options that affect the output.
+
+    Args:
+        dcm_in (Path): the DICOM input
+        img_in (Path): the image input
+        b_compress (bool): compress the output DICOM
+        str_append (str): text to append to the series description
+
+    Returns:
+        str: the hex digest key
+    """
+    h = hashlib.sha256()
+    for f in (img_in, dcm_in):
+        h.update(f.read_bytes())
+    h.update(repr((b_compress, str_append, __version__)).encode())
+    return h.hexdigest()
+
+def cache_path(cacheDir: str, key: str) -> Path:
+    """
+    Where the cache entry for key lives (fanned out by key prefix).
+    """
+    return Path(cacheDir) / key[:2] / f'{key}.dcm'
+
+def cache_fetch(cacheDir: str, key: str, d_result: dict[str, Any]) -> bool:
+    """
+    On a cache hit, write the cached DICOM to the output of the d_result
+    record with fresh SeriesInstanceUID and SOPInstanceUID (the pixel
+    data is passed through as is) and mark the entry as recently used.
+    An entry that cannot be read (e.g. left truncated by a killed run)
+    is removed and treated as a miss.
+
+    Returns:
+        bool: was this a cache hit?
+    """
+    cached:Path = cache_path(cacheDir, key)
+    try:
+        DICOM:pydicom.Dataset   = pydicom.dcmread(str(cached))
+        os.utime(cached)
+    except FileNotFoundError:
+        d_result['cache']       = 'miss'
+        return False
+    except Exception as ex:
+        LOG("Removing unreadable cache entry %s: %s" % (cached, ex))
+        cached.unlink(missing_ok = True)
+        d_result['cache']       = 'miss'
+        return False
+    DICOM.SeriesInstanceUID     = pydicom.uid.generate_uid()
+    DICOM.SOPInstanceUID        = pydicom.uid.generate_uid()
+    DICOM.save_as(d_result['outputDCM'])
+    d_result['cache']           = 'hit'
+    d_result['bytes']           = Path(d_result['outputDCM']).stat().st_size
+    LOG("Saved %s from cache" % d_result['outputDCM'])
+    return True
+
+def cache_store(cacheDir: str, key: str, d_result: dict[str, Any]) -> None:
+    """
+    Add a copy of the output of the d_result record to the cache. This
+    is deliberately not a hardlink: a later run writing to the same
+    output path would otherwise rewrite the cache entry in place.
+    """
+    cached:Path = cache_path(cacheDir, key)
+    cached.parent.mkdir(parents = True, exist_ok = True)
+    tmp:Path    = cached.with_suffix('.%d.tmp' % os.getpid())
+    shutil.copyfile(d_result['outputDCM'], tmp)
+    os.replace(tmp, cached)
+
+def cache_evict(cacheDir: str, maxBytes: int) -> None:
+    """
+    Remove the least recently used cache entries until the cache is
+    no larger than maxBytes. Since the cache can be shared by
+    concurrent runs, entries may vanish underfoot; in-flight `*.tmp`
+    files of cache_store() are not considered.
+    """
+    l_entries:list[tuple[float, int, Path]] = []
+    for f in Path(cacheDir).glob('*/*.dcm'):
+        try:
+            st = f.stat()
+        except FileNotFoundError:
+            continue
+        l_entries.append((st.st_mtime, st.st_size, f))
+    total:int   = sum(size for _, size, _ in l_entries)
+    for _, size, f in sorted(l_entries):
+        if total <= maxBytes:
+            break
+        f.unlink(missing_ok = True)
+        total -= size
+    LOG("Cache %s holds %d bytes" % (cacheDir, total))
+
+def imagePaths_process(*args) -> dict[str, Any]:
     """
     The input *args is a tuple that contains three
     file (Paths) to process. Since this method can
     be called either from a ProcessPoolExecutor mapper
     or directly, the try/catch is needed to correctly
     unpack the arguments in either case.
+
+    Any failure is caught and recorded in the returned
+    result record (see result_init()) so that a single
+    bad pair does not stop the run.
     """
     try:
         dcm_in:Path     = args[0][0]
@@ -374,25 +646,317 @@ def imagePaths_process(*args) -> None:
         dcm_out:Path    = args[0][2]
         b_compress:bool = args[0][3]
         str_append:str  = args[0][4]
+        cacheDir:str    = args[0][5]
     except:
         dcm_in:Path      = args[0]
         img_in:Path      = args[1]
         dcm_out:Path     = args[2]
         b_compress:bool  = args[3]
         str_append:str   = args[4]
+        cacheDir:str     = args[5] if len(args) > 5 else ''
+
+    d_result:dict[str, Any] = result_init(dcm_in, img_in, dcm_out)
+    if not imageNames_areSame(img_in, dcm_in):
+        d_result['status']  = 'skipped'
+        return d_result
+    try:
+        tic:float           = time.perf_counter()
+        if cacheDir:
+            key:str         = cache_key(dcm_in, img_in, b_compress, str_append)
+            if cache_fetch(cacheDir, key, d_result):
+                d_result['timing']['read']  = time.perf_counter() - tic
+                return d_result
+        with Image.open(str(img_in)) as image:
+            frame:np.ndarray    = np.asarray(image, dtype=np.uint8)
+        d_result['timing']['read']  = time.perf_counter() - tic
+        frame_intoDICOMsave(frame, frameTags_determine(frame), d_result, b_compress, str_append)
+        if cacheDir:
+            cache_store(cacheDir, key, d_result)
+    except Exception as ex:
+        result_fail(d_result, ex)
+    return d_result
+
+def imageBatch_process(batch: tuple[list[tuple[Path, Path, Path]], bool, str, str]) -> list[dict[str, Any]]:
+    """
+    The input batch is one item of files_batchUnspool(): a list of
+    (DICOM input, image input, DICOM output) triplets, all of whose
+    images share the same size and mode, together with the compress,
+    series description and cache settings. The images are decoded
+    directly into one preallocated stack, which is converted to uint8
+    and has its DICOM tags determined once for the whole batch; each
+    frame is then sliced out into its DICOM.
+
+    As with imagePaths_process(), failures are recorded per pair in
+    the returned list of result records.
+    """
+    l_batch, b_compress, str_append, cacheDir = batch
+
+    l_results:list[dict[str, Any]]  = []
+    l_decoded:list[dict[str, Any]]  = []
+    l_keys:list[str]                = []
+    stack:np.ndarray | None         = None
+    for dcm_in, img_in, dcm_out in l_batch:
+        d_result:dict[str, Any] = result_init(dcm_in, img_in, dcm_out)
+        l_results.append(d_result)
+        if not imageNames_areSame(img_in, dcm_in):
+            d_result['status']  = 'skipped'
+            continue
+        try:
+            tic:float           = time.perf_counter()
+            key:str             = ''
+            if cacheDir:
+                key             = cache_key(dcm_in, img_in, b_compress, str_append)
+                if cache_fetch(cacheDir, key, d_result):
+                    d_result['timing']['read']  = time.perf_counter() - tic
+                    continue
+            with Image.open(str(img_in)) as image:
+                if stack is None:
+                    # the first frame fixes the stack's shape and (native) dtype
+                    first:np.ndarray    = np.asarray(image)
+                    stack               = np.empty((len(l_batch),) + first.shape, dtype=first.dtype)
+                    stack[0]            = first
+                else:
+                    # decode straight into the stack
+                    stack[len(l_decoded)]   = image
+            d_result['timing']['read']  = time.perf_counter() - tic
+            l_decoded.append(d_result)
+            l_keys.append(key)
+        except Exception as ex:
+            result_fail(d_result, ex)
+    if stack is None:
+        return l_results
+
+    # one dtype conversion for the whole batch (a no-op for 8 bit images)
+    stack                   = stack[:len(l_decoded)].astype(np.uint8, copy = False)
+    d_tags:dict[str, Any]   = frameTags_determine(stack[0])
+    for d_result, key, frame in zip(l_decoded, l_keys, stack):
+        try:
+            frame_intoDICOMsave(frame, d_tags, d_result, b_compress, str_append)
+            if cacheDir:
+                cache_store(cacheDir, key, d_result)
+        except Exception as ex:
+            result_fail(d_result, ex)
+    return l_results
 
-    if imageNames_areSame(img_in, dcm_in):
-        image:Image.Image       = Image.open(str(img_in))
-        DICOM:pydicom.Dataset   = pydicom.dcmread(str(dcm_in))
-        LOG("Processing %s using %s" % (dcm_in.name, img_in.name))
+def report_init(total: int) -> dict[str, Any]:
+    """
+    Create an empty report, to be filled in by report_add() as result
+    records complete.
 
-        if b_compress:
-            compress_DICOM(image, DICOM, str(dcm_out), str_append)
-        else:
-            image_intoDICOMinsert(image, DICOM, str_append).save_as(str(dcm_out))
+    Args:
+        total (int): total number of pairs in the run
+
+    Returns:
+        dict[str, Any]: the (empty) aggregated report
+    """
+    d_summary:dict[str, Any] = {
+        'total'     : total,
+        'ok'        : 0,
+        'skipped'   : 0,
+        'failed'    : 0,
+        'cancelled' : 0,
+        'cached'    : 0,
+        'bytes'     : 0,
+        'timing'    : {'read': 0.0, 'insert': 0.0, 'save': 0.0},
+        'aborted'   : False
+    }
+    return {'summary': d_summary, 'files': []}
+
+def report_add(d_report: dict[str, Any], d_result: dict[str, Any]) -> None:
+    """
+    Add a single result record to the report and its summary.
+    """
+    d_summary:dict[str, Any]        = d_report['summary']
+    d_report['files'].append(d_result)
+    d_summary[d_result['status']]   += 1
+    d_summary['bytes']              += d_result['bytes']
+    d_summary['cached']             += d_result['cache'] == 'hit'
+    for stage, t in d_result['timing'].items():
+        d_summary['timing'][stage]  += t
+
+def job_results(job: tuple, result: Any) -> list[dict[str, Any]]:
+    """
+    The result records of a job, which is either a single pair (from
+    files_unspool()) or a batch of pairs (from files_batchUnspool()).
+    A result of None means the job did not complete, in which case
+    each of its pairs gets a 'cancelled' record.
+    """
+    if result is None:
+        l_pairs:list = job[0] if isinstance(job[0], list) else [job[:3]]
+        l_cancelled:list[dict[str, Any]] = []
+        for dcm_in, img_in, dcm_out in l_pairs:
+            d_result:dict[str, Any] = result_init(dcm_in, img_in, dcm_out)
+            d_result['status']      = 'cancelled'
+            l_cancelled.append(d_result)
+        return l_cancelled
+    return result if isinstance(result, list) else [result]
+
+def jobs_run(processor: Callable[[Any], Any], jobs: Iterable[tuple],
+             pool: ProcessPoolExecutor | None,
+             d_report: dict[str, Any], maxErrorRate: float) -> None:
+    """
+    Run the jobs, either directly or on the pool, and add their result
+    records to the report in order as they complete. Stops (and flags
+    the report as aborted) once the number of failures exceeds
+    maxErrorRate of the total number of pairs.
+
+    However the run ends, every pair is accounted for in the report:
+    pool jobs still running are waited for and collected, and jobs
+    that never ran are recorded as 'cancelled'.
 
-        LOG("Saved %s" % dcm_out)
+    Args:
+        processor (Callable[[Any], Any]): imagePaths_process or imageBatch_process
+        jobs (Iterable[tuple]): the jobs, i.e. the processor arguments
+        pool (ProcessPoolExecutor | None): run jobs here, if specified
+        d_report (dict[str, Any]): the report to add to
+        maxErrorRate (float): tolerated fraction of failed pairs
+    """
+    d_summary:dict[str, Any]    = d_report['summary']
+    q_jobs:collections.deque    = collections.deque(
+        (job, pool.submit(processor, job) if pool else None) for job in jobs
+    )
+    try:
+        while q_jobs and not d_summary['aborted']:
+            job, future     = q_jobs[0]
+            result:Any      = future.result() if future else processor(job)
+            q_jobs.popleft()
+            for d_result in job_results(job, result):
+                report_add(d_report, d_result)
+            if d_summary['failed'] > maxErrorRate * d_summary['total']:
+                LOG("Aborting: %d failures exceed max error rate of %s" %
+                    (d_summary['failed'], maxErrorRate))
+                d_summary['aborted']    = True
+    finally:
+        for _, future in q_jobs:
+            if future:
+                future.cancel()
+        for job, future in q_jobs:
+            result = None
+            if future and not future.cancelled():
+                try:
+                    result = future.result()
+                except BaseException as ex:
+                    LOG("Job did not complete: %s" % ex)
+            for d_result in job_results(job, result):
+                report_add(d_report, d_result)
+        LOG("Processed %d: %d ok, %d skipped, %d failed, %d cancelled" % (
+            len(d_report['files']), d_summary['ok'], d_summary['skipped'],
+            d_summary['failed'], d_summary['cancelled']))
+
+def report_save(d_report: dict[str, Any], reportFile: Path) -> None:
+    """
+    Save the aggregated report as JSON.
+    """
+    reportFile.parent.mkdir(parents = True, exist_ok = True)
+    with open(reportFile, 'w') as f:
+        json.dump(d_report, f, indent = 4)
+    LOG("Saved report %s" % reportFile)
+
+_profiler: cProfile.Profile | None = None
+
+def profile_workerStart(profileDir: str) -> None:
+    """
+    ProcessPoolExecutor initializer used when profiling: enable a
+    cProfile profiler for the lifetime of this worker process, and
+    register profile_workerDump() to run once when the worker exits.
+
+    Args:
+        profileDir (str): directory for the per process profile files
+    """
+    global _profiler
+    _profiler   = cProfile.Profile()
+    _profiler.enable()
+    multiprocessing.util.Finalize(None, profile_workerDump, args = (profileDir,), exitpriority = 10)
+
+def profile_workerDump(profileDir: str) -> None:
+    """
+    Stop the worker's profiler and dump its stats to profileDir.
+    """
+    if _profiler is None:
+        return
+    _profiler.disable()
+    _profiler.dump_stats(os.path.join(profileDir, f'worker-{os.getpid()}.prof'))
+
+def profiles_merge(profileDir: Path) -> None:
+    """
+    Merge the parent and worker profile files in profileDir into
+    `merged.prof` (pstats format, readable by snakeviz, flameprof,
+    gprof2dot, etc) and a `merged.txt` summary sorted by cumulative
+    time.
+
+    Args:
+        profileDir (Path): the directory containing the profile files
+    """
+    l_prof:list[str]    = sorted(str(f) for f in profileDir.glob('parent-*.prof')) + \
+                          sorted(str(f) for f in profileDir.glob('worker-*.prof'))
+    stats:pstats.Stats  = pstats.Stats(*l_prof)
+    stats.dump_stats(str(profileDir / 'merged.prof'))
+    with open(profileDir / 'merged.txt', 'w') as f:
+        stats.stream = f
+        stats.sort_stats('cumulative').print_stats()
+    LOG("Merged %d profiles into %s" % (len(l_prof), profileDir / 'merged.prof'))
+
+def files_process(options: Namespace, inputdir: Path, outputdir: Path,
+                  profileDir: Path | None = None) -> int:
+    """
+    Decide whether or not to call the imagePaths_process() (or, if
+    batching, imageBatch_process()) function in series or in parallel,
+    and collect the results.
+
+    Args:
+        options (Namespace): the CLI options
+        inputdir (Path): the input directory path containing data to process
+        outputdir (Path): the output directory where results are saved
+        profileDir (Path | None, optional): if specified, profile each pool
+            worker into this directory. Defaults to None.
+
+    Returns:
+        int: 0 here means success, 1 that the run was aborted since
+             the maximum error rate was exceeded.
+    """
+    d_paths:dict[str, Any] = env_setupAndCheck(options, inputdir, outputdir)
+    processor:Callable[[Any], Any]
+    jobs:Iterator[Any]
+    if options.batchSize > 0:
+        processor   = imageBatch_process
+        jobs        = files_batchUnspool(d_paths, options.batchSize, options.compress,
+                                         options.appendToSeriesDescription, options.cacheDir)
+    else:
+        processor   = imagePaths_process
+        jobs        = files_unspool(d_paths, options.compress,
+                                    options.appendToSeriesDescription, options.cacheDir)
 
+    # pairs are zipped from the input lists, so only the shortest counts
+    d_report:dict[str, Any] = report_init(min(len(l) for l in d_paths['d_IO'].values()))
+    try:
+        if int(options.thread):
+            d_poolArgs:dict[str, Any] = {}
+            if profileDir:
+                # Spawn (rather than fork) the workers, since a forked worker
+                # inherits the parent's already active profiler, and from
+                # Python 3.12 enabling a second one raises.
+                d_poolArgs = {
+                    'mp_context'    : multiprocessing.get_context('spawn'),
+                    'initializer'   : profile_workerStart,
+                    'initargs'      : (str(profileDir),)
+                }
+            # While the "thread" implies "threading", we actually use
+            # a ProcessPoolExecutor since the single threaded GIL actually
+            # does not perform python file loading/saving in parallel.
+            with ProcessPoolExecutor(**d_poolArgs) as pool:
+                jobs_run(processor, jobs, pool, d_report, options.maxErrorRate)
+        else:
+            jobs_run(processor, jobs, None, d_report, options.maxErrorRate)
+        if options.cacheDir:
+            cache_evict(options.cacheDir, options.cacheMaxSize * 1024 * 1024)
+    except BaseException:
+        d_report['summary']['aborted'] = True
+        raise
+    finally:
+        # save whatever was gathered, also if the run died
+        if options.report:
+            report_save(d_report, outputdir / options.report)
+    return 1 if d_report['summary']['aborted'] else 0
 
 @chris_plugin(
     parser          = parser,
@@ -409,8 +973,7 @@ def imagePaths_process(*args) -> None:
 def main(options: Namespace, inputdir: Path, outputdir: Path) -> int:
     """
     The main entry point for this plugin/app. Mostly this function simply
-    decides whether or not to call the imagePaths_process() function in
-    series or in parallel.
+    hands off to files_process(), optionally under the profiler.
 
     Take a look at imagePaths_process() to better understand the logic.
 
@@ -420,26 +983,22 @@ def main(options: Namespace, inputdir: Path, outputdir: Path) -> int:
         outputdir (Path): the output directory where results are saved
 
     Returns:
-        int: 0 here means success.
+        int: 0 here means success, 1 that the run was aborted since
+             the maximum error rate was exceeded.
     """
     # pudb.set_trace()
-    d_paths:dict[str, Any] = env_setupAndCheck(options, inputdir, outputdir)
-    mapper: Iterator[tuple[Path, Path, Path, bool, str]] = files_unspool(d_paths, options.compress, options.appendToSeriesDescription)
-    if int(options.thread):
-        # While the "thread" implies "threading", we actually use
-        # a ProcessPoolExecutor since the single threaded GIL actually
-        # does not perform python file loading/saving in parallel.
-        with ProcessPoolExecutor() as pool:
-            results: Iterator[None]     = pool.map(imagePaths_process, mapper)
-
-        # raise any Exceptions which happened in threads
-        for _ in results:
-            pass
-    else:
-        for dcm_in, img_in, dcm_out, compress, appendTxt in mapper:
-            imagePaths_process(dcm_in, img_in, dcm_out, compress, appendTxt)
-
-    return 0
+    if not options.profile:
+        return files_process(options, inputdir, outputdir)
+
+    profileDir:Path         = outputdir / options.profile
+    profileDir.mkdir(parents = True, exist_ok = True)
+    for stale in [*profileDir.glob('parent-*.prof'), *profileDir.glob('worker-*.prof')]:
+        stale.unlink()
+    profiler:cProfile.Profile   = cProfile.Profile()
+    ret:int                 = profiler.runcall(files_process, options, inputdir, outputdir, profileDir)
+    profiler.dump_stats(str(profileDir / f'parent-{os.getpid()}.prof'))
+    profiles_merge(profileDir)
+    return ret
 
 if __name__ == '__main__':
     sys.exit(main())
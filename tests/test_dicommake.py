@@ -1,5 +1,16 @@
+import json
+import os
+import shutil
 from pathlib import Path
 
+import numpy as np
+import pydicom
+import pytest
+from PIL import Image
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+
+import dicommake
 from dicommake import parser, main, imageNames_areSame
 
 def test_imageNames_areSame() -> None:
@@ -7,19 +18,216 @@ def test_imageNames_areSame() -> None:
     dcmFile     = Path('/some/other/place/with/dicom/1.1012.432543.dcm')
     assert imageNames_areSame(imgFile, dcmFile) == True
 
-# def test_main(tmp_path: Path):
-#     # setup example data
-#     inputdir = tmp_path / 'incoming'
-#     outputdir = tmp_path / 'outgoing'
-#     inputdir.mkdir()
-#     outputdir.mkdir()
-#     (inputdir / 'plaintext.txt').write_text('hello ChRIS, I am a ChRIS plugin')
-
-#     # simulate run of main function
-#     options = parser.parse_args(['--word', 'ChRIS', '--pattern', '*.txt'])
-#     main(options, inputdir, outputdir)
-
-#     # assert behavior is expected
-#     expected_output_file = outputdir / 'plaintext.count.txt'
-#     assert expected_output_file.exists()
-#     assert expected_output_file.read_text() == '2'
+def exemplar_make(inputdir: Path, stem: str, image: Image.Image) -> None:
+    """
+    Write a minimal exemplar DICOM and a matching image to inputdir.
+    """
+    meta                            = FileMetaDataset()
+    meta.MediaStorageSOPClassUID    = pydicom.uid.SecondaryCaptureImageStorage
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID          = ExplicitVRLittleEndian
+    ds                              = Dataset()
+    ds.file_meta                    = meta
+    ds.SOPClassUID                  = meta.MediaStorageSOPClassUID
+    ds.SOPInstanceUID               = meta.MediaStorageSOPInstanceUID
+    ds.SeriesDescription            = 'exemplar'
+    ds.add_new(0x7FE00010, 'OB', b'\x00\x00')
+    ds.save_as(str(inputdir / f'{stem}.dcm'), enforce_file_format = True)
+    image.save(str(inputdir / f'{stem}.png'))
+
+def test_main_batch(tmp_path: Path) -> None:
+    inputdir    = tmp_path / 'incoming'
+    inputdir.mkdir()
+    rng         = np.random.default_rng(0)
+    for i in range(5):
+        exemplar_make(inputdir, f'gray{i}',
+                      Image.fromarray(rng.integers(0, 255, (8, 6), dtype=np.uint8)))
+    for i in range(3):
+        exemplar_make(inputdir, f'rgb{i}',
+                      Image.fromarray(rng.integers(0, 255, (4, 7, 3), dtype=np.uint8)))
+
+    for args in ([], ['--batchSize', '2']):
+        outputdir = tmp_path / f'outgoing{len(args)}'
+        outputdir.mkdir()
+        options = parser.parse_args(['--appendToSeriesDescription', 'made'] + args)
+        assert main(options, inputdir, outputdir) == 0
+
+    for single in sorted((tmp_path / 'outgoing0').glob('*.dcm')):
+        batched = pydicom.dcmread(str(tmp_path / 'outgoing2' / single.name))
+        single  = pydicom.dcmread(str(single))
+        for tag in ('PixelData', 'Rows', 'Columns', 'SamplesPerPixel',
+                    'PhotometricInterpretation', 'SeriesDescription'):
+            assert getattr(batched, tag) == getattr(single, tag)
+    assert len(list((tmp_path / 'outgoing2').glob('*.dcm'))) == 8
+
+def test_main_failureIsolation(tmp_path: Path) -> None:
+    inputdir    = tmp_path / 'incoming'
+    inputdir.mkdir()
+    for i in range(4):
+        exemplar_make(inputdir, f'img{i}', Image.fromarray(np.full((4, 4), i, dtype=np.uint8)))
+    (inputdir / 'img1.png').write_bytes(b'not a png')
+
+    for args in ([], ['--batchSize', '3'], ['--thread']):
+        outputdir = tmp_path / f'outgoing{len(args)}'
+        outputdir.mkdir()
+        options = parser.parse_args(['--report', 'report.json'] + args)
+        assert main(options, inputdir, outputdir) == 0
+
+        d_report = json.loads((outputdir / 'report.json').read_text())
+        assert d_report['summary']['ok'] == 3
+        assert d_report['summary']['failed'] == 1
+        assert [d['status'] for d in d_report['files'] if d['inputIMG'].endswith('img1.png')] == ['failed']
+        assert sorted(p.name for p in outputdir.glob('*.dcm')) == ['img0.dcm', 'img2.dcm', 'img3.dcm']
+
+    options = parser.parse_args(['--maxErrorRate', '0.1'])
+    assert main(options, inputdir, tmp_path / 'outgoing0') == 1
+
+def test_main_abortReport(tmp_path: Path) -> None:
+    inputdir    = tmp_path / 'incoming'
+    inputdir.mkdir()
+    for i in range(40):
+        exemplar_make(inputdir, f'img{i:02}', Image.fromarray(np.full((4, 4), i, dtype=np.uint8)))
+        if i % 2:
+            (inputdir / f'img{i:02}.png').write_bytes(b'not a png')
+
+    for args in ([], ['--thread'], ['--thread', '--batchSize', '4']):
+        outputdir = tmp_path / f'outgoing{len(args)}'
+        outputdir.mkdir()
+        options = parser.parse_args(['--report', 'report.json', '--maxErrorRate', '0.05'] + args)
+        assert main(options, inputdir, outputdir) == 1
+
+        d_report    = json.loads((outputdir / 'report.json').read_text())
+        d_summary   = d_report['summary']
+        assert d_summary['aborted']
+        assert d_summary['total'] == len(d_report['files']) == 40
+        assert d_summary['cancelled'] > 0
+        assert d_summary['ok'] == len(list(outputdir.glob('*.dcm')))
+
+def test_main_interruptedReport(tmp_path: Path, monkeypatch) -> None:
+    inputdir    = tmp_path / 'incoming'
+    outputdir   = tmp_path / 'outgoing'
+    inputdir.mkdir()
+    outputdir.mkdir()
+    for i in range(4):
+        exemplar_make(inputdir, f'img{i}', Image.fromarray(np.full((4, 4), i, dtype=np.uint8)))
+
+    imagePaths_process  = dicommake.imagePaths_process
+    def interrupted(job):
+        if job[0].stem == 'img2':
+            raise KeyboardInterrupt
+        return imagePaths_process(job)
+    monkeypatch.setattr(dicommake, 'imagePaths_process', interrupted)
+
+    options = parser.parse_args(['--report', 'report.json'])
+    with pytest.raises(KeyboardInterrupt):
+        main(options, inputdir, outputdir)
+    d_summary   = json.loads((outputdir / 'report.json').read_text())['summary']
+    assert d_summary['aborted']
+    assert (d_summary['ok'], d_summary['cancelled']) == (2, 2)
+
+def test_main_profile(tmp_path: Path) -> None:
+    inputdir    = tmp_path / 'incoming'
+    outputdir   = tmp_path / 'outgoing'
+    inputdir.mkdir()
+    outputdir.mkdir()
+    for i in range(4):
+        exemplar_make(inputdir, f'img{i}', Image.fromarray(np.full((4, 4), i, dtype=np.uint8)))
+
+    # a worker that cannot start (e.g. its profiler failing to enable)
+    # breaks the pool, and so fails the run
+    options = parser.parse_args(['--thread', '--profile', 'profile', '--report', 'report.json'])
+    assert main(options, inputdir, outputdir) == 0
+    d_summary   = json.loads((outputdir / 'report.json').read_text())['summary']
+    assert (d_summary['ok'], d_summary['cancelled']) == (4, 0)
+
+    profileDir  = outputdir / 'profile'
+    assert len(list(profileDir.glob('parent-*.prof'))) == 1
+    assert len(list(profileDir.glob('worker-*.prof'))) >= 1
+    assert (profileDir / 'merged.prof').exists()
+    assert 'frame_intoDICOMsave' in (profileDir / 'merged.txt').read_text()
+
+def test_main_cache(tmp_path: Path) -> None:
+    inputdir    = tmp_path / 'incoming'
+    cacheDir    = tmp_path / 'cache'
+    inputdir.mkdir()
+    for i in range(3):
+        exemplar_make(inputdir, f'img{i}', Image.fromarray(np.full((4, 4), i, dtype=np.uint8)))
+
+    for run, args in enumerate(([], [], ['--batchSize', '2'])):
+        outputdir = tmp_path / f'outgoing{run}'
+        outputdir.mkdir()
+        options = parser.parse_args(['--cacheDir', str(cacheDir), '--report', 'report.json'] + args)
+        assert main(options, inputdir, outputdir) == 0
+        d_report = json.loads((outputdir / 'report.json').read_text())
+        assert d_report['summary']['cached'] == (0 if not run else 3)
+
+    for name in ('img0.dcm', 'img1.dcm', 'img2.dcm'):
+        made    = pydicom.dcmread(str(tmp_path / 'outgoing0' / name))
+        for run in (1, 2):
+            cached  = pydicom.dcmread(str(tmp_path / f'outgoing{run}' / name))
+            assert cached.PixelData == made.PixelData
+            assert cached.SOPInstanceUID != made.SOPInstanceUID
+
+    options = parser.parse_args(['--cacheDir', str(cacheDir), '--cacheMaxSize', '0'])
+    assert main(options, inputdir, tmp_path / 'outgoing0') == 0
+    assert list(cacheDir.glob('*/*.dcm')) == []
+
+def test_main_cacheRerunAndCorrupt(tmp_path: Path) -> None:
+    inputdir    = tmp_path / 'incoming'
+    outputdir   = tmp_path / 'outgoing'
+    cacheDir    = tmp_path / 'cache'
+    inputdir.mkdir()
+    outputdir.mkdir()
+    for i in range(3):
+        exemplar_make(inputdir, f'img{i}', Image.fromarray(np.full((4, 4), i + 7, dtype=np.uint8)))
+    options = parser.parse_args(['--cacheDir', str(cacheDir), '--report', 'report.json'])
+    assert main(options, inputdir, outputdir) == 0
+    original    = (inputdir / 'img0.png').read_bytes()
+
+    # rerun into the same outputdir with a changed image must not touch the original entry
+    Image.fromarray(np.full((4, 4), 99, dtype=np.uint8)).save(str(inputdir / 'img0.png'))
+    assert main(options, inputdir, outputdir) == 0
+    (inputdir / 'img0.png').write_bytes(original)
+    assert main(options, inputdir, outputdir) == 0
+    assert json.loads((outputdir / 'report.json').read_text())['summary']['cached'] == 3
+    assert pydicom.dcmread(str(outputdir / 'img0.dcm')).PixelData == bytes([7]) * 16
+
+    # corrupt entries are regenerated rather than failing the run
+    for entry in cacheDir.glob('*/*.dcm'):
+        entry.write_bytes(b'junk')
+    assert main(options, inputdir, outputdir) == 0
+    d_summary   = json.loads((outputdir / 'report.json').read_text())['summary']
+    assert (d_summary['ok'], d_summary['failed'], d_summary['cached']) == (3, 0, 0)
+    assert pydicom.dcmread(str(outputdir / 'img0.dcm')).PixelData == bytes([7]) * 16
+
+def test_main_cacheLRU(tmp_path: Path) -> None:
+    inputdir    = tmp_path / 'incoming'
+    cacheDir    = tmp_path / 'cache'
+    inputdir.mkdir()
+    for i in range(3):
+        exemplar_make(inputdir, f'img{i}', Image.fromarray(np.full((4, 4), i, dtype=np.uint8)))
+    options = parser.parse_args(['--cacheDir', str(cacheDir)])
+    assert main(options, inputdir, tmp_path / 'outgoing') == 0
+
+    # age the entries so that img0 is the least recently used ...
+    d_entry: dict[str, Path] = {}
+    for i in range(3):
+        key = dicommake.cache_key(inputdir / f'img{i}.dcm', inputdir / f'img{i}.png', False, '')
+        d_entry[f'img{i}'] = dicommake.cache_path(str(cacheDir), key)
+        os.utime(d_entry[f'img{i}'], (1000 * (i + 1), 1000 * (i + 1)))
+
+    # ... until a hit on it makes img1 the least recently used
+    hitdir      = tmp_path / 'hit'
+    hitdir.mkdir()
+    for suffix in ('.dcm', '.png'):
+        shutil.copyfile(inputdir / f'img0{suffix}', hitdir / f'img0{suffix}')
+    options = parser.parse_args(['--cacheDir', str(cacheDir), '--report', 'report.json'])
+    assert main(options, hitdir, tmp_path / 'outgoing') == 0
+    assert json.loads((tmp_path / 'outgoing' / 'report.json').read_text())['summary']['cached'] == 1
+
+    dicommake.cache_evict(str(cacheDir), sum(f.stat().st_size for f in d_entry.values()) - 1)
+    assert [name for name, f in d_entry.items() if f.exists()] == ['img0', 'img2']
+
+def test_cacheDir_absolute() -> None:
+    with pytest.raises(SystemExit):
+        parser.parse_args(['--cacheDir', 'relative/cache'])